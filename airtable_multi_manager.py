@@ -1,10 +1,70 @@
 import os
-from typing import Dict, Optional, List
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Optional, List, Tuple
 from airtable import Airtable
 from table_manager import TableManager
 from sqlite_storage import SQLiteStorage
-from utilities import load_env
+from utilities import load_env, default_index_columns
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# orjson (in requirements.txt) parses Meta API responses faster; fall back to json if it is missing
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    import json
+    _json_loads = json.loads
+
+# Airtable allows 5 requests per second per base; more returns 429 and locks the base out for 30s
+AIRTABLE_REQUESTS_PER_SECOND = 5
+# Base id in data API (/v0/<base>/...) and Meta API (/v0/meta/bases/<base>/...) URLs
+_BASE_ID_PATTERN = re.compile(r'/v0/(?:meta/bases/)?([^/?]+)')
+
+
+class _BaseRateLimiter:
+    """Spaces out requests to one Airtable base so every thread together stays under the limit."""
+
+    def __init__(self, requests_per_second: float = AIRTABLE_REQUESTS_PER_SECOND):
+        self.interval = 1.0 / requests_per_second
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        """Block until this caller's request slot comes up."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# base_id -> limiter, shared by every session in the process (app routes, scheduler, table updates)
+_rate_limiters: Dict[str, _BaseRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def _rate_limiter_for(base_id: str) -> _BaseRateLimiter:
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(base_id)
+        if limiter is None:
+            limiter = _rate_limiters[base_id] = _BaseRateLimiter()
+        return limiter
+
+
+class _RateLimitedSession(requests.Session):
+    """requests.Session that waits on the per-base rate limiter before each Airtable request."""
+
+    def request(self, method, url, *args, **kwargs):
+        match = _BASE_ID_PATTERN.search(url)
+        if match:
+            _rate_limiter_for(match.group(1)).wait()
+        return super().request(method, url, *args, **kwargs)
 
 
 class AirtableMultiManager:
@@ -12,6 +72,14 @@ class AirtableMultiManager:
     Manages multiple TableManager instances for tables within a single Airtable base.
     Allows easy access to different tables by table name.
     """
+
+    # Upper bound on tables fetched from Airtable at the same time; requests to the
+    # base are still paced by its shared rate limiter
+    MAX_UPDATE_WORKERS = 8
+    # Seconds a base's table list from the Meta API is reused before fetching it again
+    TABLES_CACHE_TTL = 60
+    # Timeout in seconds for Airtable Meta API requests
+    META_API_TIMEOUT = 10
     
     def __init__(self, api_key: str, base_id: str, table_names: Optional[List[str]] = None, sqlite_storage: Optional[SQLiteStorage] = None):
         """
@@ -26,41 +94,67 @@ class AirtableMultiManager:
         self.api_key = api_key
         self.base_id = base_id
         self.managers: Dict[str, TableManager] = {}
-        self.sqlite_storage = sqlite_storage or SQLiteStorage()  # Always use a shared storage
+        self.sqlite_storage = sqlite_storage or SQLiteStorage.get_default()  # Always use a shared storage
+        # base_id -> (time fetched, table names) from get_tables_from_base
+        self._tables_cache: Dict[str, Tuple[float, List[str]]] = {}
+        # Keep-alive session for Meta API calls, so repeated calls skip the TCP/TLS handshake
+        self._session = self._create_session(api_key)
 
         # Default table names if none provided
         if table_names is None:
-            self.table_names = ["DataHub_Craffft"]  # Default table
-        else:
-            self.table_names = table_names
+            table_names = ["DataHub_Craffft"]  # Default table
         
         # Initialize managers for all configured tables
-        self._initialize_managers()
+        self._initialize_managers(table_names)
     
-    def _initialize_managers(self):
+    @staticmethod
+    def _create_session(api_key: str) -> requests.Session:
+        """Create a rate-limited requests session with Airtable auth headers and retries on transient errors."""
+        session = _RateLimitedSession()
+        session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json'
+        })
+        # Retries after the first wait 2, 4, 8, 16 then 32s, which outlasts the 30s lockout after a 429
+        retry = Retry(total=8, connect=2, read=2, status=6, backoff_factor=1,
+                      status_forcelist=[429, 500, 502, 503, 504])
+        session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry))
+        return session
+
+    @property
+    def table_names(self) -> List[str]:
+        """Names of the managed tables, in the order they were added."""
+        return list(self.managers.keys())
+
+    def _initialize_managers(self, table_names: List[str]):
         """Initialize TableManager instances for all configured tables."""
-        for table_name in self.table_names:
+        for table_name in table_names:
             self.managers[table_name] = TableManager(
                 base_id=self.base_id,
                 table_name=table_name,
                 api_key=self.api_key,
-                sqlite_storage=self.sqlite_storage  # Pass shared storage
+                sqlite_storage=self.sqlite_storage,  # Pass shared storage
+                index_columns=default_index_columns.get(table_name),
+                session=self._session  # Share one Airtable connection pool
             )
     
-    def add_table(self, table_name: str):
+    def add_table(self, table_name: str, index_columns: Optional[List[str]] = None):
         """
         Add a new table to the manager.
         
         Args:
             table_name: Name of the table
+            index_columns: Columns to index after each import (defaults to default_index_columns)
         """
-        if table_name not in self.table_names:
-            self.table_names.append(table_name)
+        if index_columns is None:
+            index_columns = default_index_columns.get(table_name)
         self.managers[table_name] = TableManager(
             base_id=self.base_id,
             table_name=table_name,
             api_key=self.api_key,
-            sqlite_storage=self.sqlite_storage  # Pass shared storage
+            sqlite_storage=self.sqlite_storage,  # Pass shared storage
+            index_columns=index_columns,
+            session=self._session  # Share one Airtable connection pool
         )
     
     def get_manager(self, table_name: str) -> Optional[TableManager]:
@@ -105,22 +199,53 @@ class AirtableMultiManager:
             return manager.get_table_as_json()
         return None
     
+    def stream_csv(self, table_name: str):
+        """
+        Stream a specific table as CSV lines.
+        
+        Args:
+            table_name: Name of the table
+            
+        Returns:
+            Generator of CSV lines or None if not found
+        """
+        manager = self.get_manager(table_name)
+        if manager:
+            return manager.stream_csv()
+        return None
+    
     def update_all_tables(self) -> Dict[str, str]:
         """
         Update CSV files from Airtable for all configured tables.
+        Tables are fetched in parallel since each update is bound by Airtable requests.
         
         Returns:
             Dictionary with table names as keys and status messages as values
         """
         results = {}
-        for table_name in self.managers.keys():
-            try:
-                result = self.update_database_from_airtable(table_name)
-                results[table_name] = result if result else "Failed to update"
-            except Exception as e:
-                results[table_name] = f"Error: {str(e)}"
-        return results
-    
+        table_names = list(self.managers.keys())
+        if not table_names:
+            return results
+        if not self.sqlite_storage:
+            # Every table would fetch from Airtable and then have nowhere to store the records
+            return {table_name: "No storage configured" for table_name in table_names}
+
+        max_workers = min(self.MAX_UPDATE_WORKERS, len(table_names))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.update_database_from_airtable, table_name): table_name
+                for table_name in table_names
+            }
+            for future in as_completed(futures):
+                table_name = futures[future]
+                try:
+                    result = future.result()
+                    results[table_name] = result if result else "Failed to update"
+                except Exception as e:
+                    results[table_name] = f"Error: {str(e)}"
+        # Report in the configured table order rather than completion order
+        return {table_name: results[table_name] for table_name in table_names}
+
     def get_available_tables(self) -> list:
         """
         Get list of all available table names.
@@ -140,12 +265,7 @@ class AirtableMultiManager:
         Returns:
             True if removed successfully, False if table not found
         """
-        if table_name in self.managers:
-            del self.managers[table_name]
-            if table_name in self.table_names:
-                self.table_names.remove(table_name)
-            return True
-        return False
+        return self.managers.pop(table_name, None) is not None
     
     @classmethod
     def from_environment(cls) -> 'AirtableMultiManager':
@@ -159,8 +279,8 @@ class AirtableMultiManager:
         api_key = load_env('AIRTABLE_API_KEY')
         base_id = load_env('AIRTABLE_BASE_ID')
         
-        # Use a shared SQLiteStorage instance
-        sqlite_storage = SQLiteStorage()
+        # Use the shared SQLiteStorage instance
+        sqlite_storage = SQLiteStorage.get_default()
         return cls(api_key=api_key, base_id=base_id, sqlite_storage=sqlite_storage)
 
     @classmethod
@@ -183,13 +303,14 @@ class AirtableMultiManager:
         if not base_id:
             raise ValueError("base_id is required in config")
         
-        sqlite_storage = SQLiteStorage()
+        sqlite_storage = SQLiteStorage.get_default()
         return cls(api_key=api_key, base_id=base_id, table_names=table_names, sqlite_storage=sqlite_storage)
     
 
     def get_tables_from_base(self, base_id: str = None) -> Optional[List[str]]:
         """
         Get all table names from a specific Airtable base.
+        Results are cached per base for TABLES_CACHE_TTL seconds.
         
         Args:
             base_id: The Airtable base ID to query (uses instance base_id if None)
@@ -199,21 +320,22 @@ class AirtableMultiManager:
         """
         if base_id is None:
             base_id = self.base_id
+
+        cached = self._tables_cache.get(base_id)
+        if cached and time.monotonic() - cached[0] < self.TABLES_CACHE_TTL:
+            return list(cached[1])
             
         try:
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            
             # Airtable Meta API endpoint for base schema
             url = f'https://api.airtable.com/v0/meta/bases/{base_id}/tables'
             
-            response = requests.get(url, headers=headers)
+            response = self._session.get(url, timeout=self.META_API_TIMEOUT)
             
             if response.status_code == 200:
-                data = response.json()
-                return [table['name'] for table in data.get('tables', [])]
+                data = _json_loads(response.content)
+                table_names = [table['name'] for table in data.get('tables', [])]
+                self._tables_cache[base_id] = (time.monotonic(), table_names)
+                return list(table_names)
             else:
                 print(f"Failed to get tables from base {base_id}: {response.status_code}")
                 print(f"Response: {response.text}")
@@ -223,6 +345,18 @@ class AirtableMultiManager:
             print(f"Error getting tables from base {base_id}: {str(e)}")
             return None
     
+    def invalidate_tables_cache(self, base_id: str = None):
+        """
+        Forget cached table names so the next get_tables_from_base call asks Airtable again.
+        
+        Args:
+            base_id: The base to forget (clears every base if None)
+        """
+        if base_id is None:
+            self._tables_cache.clear()
+        else:
+            self._tables_cache.pop(base_id, None)
+
     def discover_and_add_tables_from_base(self) -> Dict[str, bool]:
         """
         Discover all tables in the configured base and add them to the manager.
@@ -93,10 +93,10 @@ def home():
 @app.route("/data/csv/<table_name>", methods=['GET'])
 @app.route("/get-table-as-csv/<table_name>", methods=['GET'])
 def get_table_manager(table_name):
-    csv_data = multi_manager.get_csv_data(table_name)
-    if not csv_data:
+    csv_stream = multi_manager.stream_csv(table_name)
+    if csv_stream is None:
         return Response(f"No data found for table: {table_name}", status=404)
-    return Response(csv_data, mimetype='text/csv')
+    return Response(csv_stream, mimetype='text/csv')
 
 
 @app.route("/sync/update-all", methods=['POST'])
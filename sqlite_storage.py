@@ -1,12 +1,51 @@
 import os
+import csv
+import functools
+import io
+import json
+import re
+import threading
+from contextlib import contextmanager, nullcontext
 from typing import Optional
 from datetime import datetime
-from sqlalchemy import create_engine, Column, String, Text, DateTime, text
+from sqlalchemy import create_engine, event, Column, String, Text, DateTime, text
 from sqlalchemy.orm import declarative_base, sessionmaker
 from utilities import load_env, critical_tables
 
 Base = declarative_base()
 
+# Applied to every new SQLite connection. WAL is persistent in the database file,
+# the rest are per-connection settings.
+SQLITE_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",  # 64 MiB
+)
+SQLITE_DEFAULT_CACHE_SIZE = -65536
+SQLITE_DEFAULT_WAL_AUTOCHECKPOINT = 1000
+SQLITE_IMPORT_CACHE_SIZE = -524288  # 512 MiB while bulk importing
+# Upper bound on cached lookup statements; column names can come from API requests
+LOOKUP_STATEMENT_CACHE_SIZE = 1024
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_CONNECTION_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def _invalidates_reads(method):
+    """Bump write_generation once the wrapped write method has finished."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._bump_write_generation()
+    return wrapper
+
 class TableData(Base):
     __tablename__ = 'table_data'
     table_name = Column(String, primary_key=True)
@@ -14,6 +53,10 @@ class TableData(Base):
     json_data = Column(Text)
     updated_at = Column(DateTime, default=datetime.utcnow)
 
+# Process-wide instance returned by SQLiteStorage.get_default()
+_DEFAULT = None
+_DEFAULT_LOCK = threading.Lock()
+
 class SQLiteStorage:
     def __init__(self, db_path: str = "data/airtable_data.db"):
         # Check if we're on Heroku (DATABASE_URL environment variable)
@@ -33,12 +76,43 @@ class SQLiteStorage:
             os.makedirs(os.path.dirname(db_path), exist_ok=True)
             self.db_path = db_path
             self.engine = create_engine(f'sqlite:///{db_path}', echo=False, future=True)
+            event.listen(self.engine, "connect", _apply_sqlite_pragmas)
             print(f"Using SQLite: {db_path}")
             
         Base.metadata.create_all(self.engine)
         self.Session = sessionmaker(bind=self.engine, future=True)
+        # SQLite allows a single writer, so concurrent table imports take turns
+        self._write_lock = threading.Lock()
+        # Incremented after every write so callers caching reads know when to drop them.
+        # Only writes made through this instance count, other processes never bump it.
+        self.write_generation = 0
+        self._generation_lock = threading.Lock()
+        # (table, lookup column, target column) -> prepared SELECT, see _lookup_statement
+        self._stmt_cache = {}
+        # table -> column names, filled on first schema lookup and dropped when the schema changes.
+        # Off on Postgres, where other dynos and workers change the schema without this process knowing.
+        self._columns_cache = {}
+        self._cache_columns = self.engine.dialect.name != 'postgresql'
+
+    def _bump_write_generation(self):
+        # += is a read-modify-write, so concurrent writers could otherwise lose a bump
+        with self._generation_lock:
+            self.write_generation += 1
 
+    @classmethod
+    def get_default(cls) -> 'SQLiteStorage':
+        """
+        Get the shared storage for the default database, creating it on first use.
+        Every caller gets the same engine, connection pool and SQLite pragma setup.
+        """
+        global _DEFAULT
+        if _DEFAULT is None:
+            with _DEFAULT_LOCK:
+                if _DEFAULT is None:
+                    _DEFAULT = cls()
+        return _DEFAULT
 
+    @_invalidates_reads
     def import_dict_rows(self, table_name: str, dict_rows: list):
         """
         Import a list of dictionaries (records) directly into the specified SQLite table.
@@ -49,26 +123,26 @@ class SQLiteStorage:
             return
         fieldnames = list(dict_rows[0].keys())
         # Check for special characters in column names
-        import re
         special_char_pattern = re.compile(r'[^a-zA-Z0-9_]')
         for col in fieldnames:
             if special_char_pattern.search(col):
                 print(f"Warning: Column name '{col}' in table '{table_name}' contains special characters. This may cause issues with SQLite.")
+        table = self._quote_identifier(table_name)
         # Create table if not exists
-        columns_sql = ', '.join([f'"{col}" TEXT' for col in fieldnames])
+        columns_sql = ', '.join([f'{self._quote_identifier(col)} TEXT' for col in fieldnames])
         with self.engine.begin() as conn:
             conn.execute(
-                text(f'CREATE TABLE IF NOT EXISTS "{table_name}" ({columns_sql})')
+                text(f'CREATE TABLE IF NOT EXISTS {table} ({columns_sql})')
             )
             # Clear existing data (optional, comment out if you want to append)
-            conn.execute(text(f'DELETE FROM "{table_name}"'))
-            # Insert rows using named parameters and dicts
-            placeholders = ', '.join([f':{col}' for col in fieldnames])
-            quoted_fieldnames = ', '.join([f'"{col}"' for col in fieldnames])
-            insert_sql = text(f'INSERT INTO "{table_name}" ({quoted_fieldnames}) VALUES ({placeholders})')
+            conn.execute(text(f'DELETE FROM {table}'))
+            # Insert rows using generated parameter names, column names may not be valid bind names
+            placeholders = ', '.join([f':p{i}' for i in range(len(fieldnames))])
+            quoted_fieldnames = ', '.join([self._quote_identifier(col) for col in fieldnames])
+            insert_sql = text(f'INSERT INTO {table} ({quoted_fieldnames}) VALUES ({placeholders})')
             for row in dict_rows:
                 # Ensure all keys exist (fill missing with empty string)
-                row_dict = {col: row.get(col, '') for col in fieldnames}
+                row_dict = {f'p{i}': row.get(col, '') for i, col in enumerate(fieldnames)}
                 conn.execute(insert_sql, row_dict)
 
     def save_csv(self, table_name: str, csv_data: str):
@@ -105,32 +179,238 @@ class SQLiteStorage:
             obj = session.get(TableData, table_name)
             return obj.json_data if obj else None
 
-    def import_csv_rows(self, table_name: str, csv_data: str):
-        import csv
-        import io
-        with self.engine.begin() as conn:
-            reader = csv.DictReader(io.StringIO(csv_data))
-            fieldnames = reader.fieldnames
-            # Create table if not exists
-            columns_sql = ', '.join([f'"{col}" TEXT' for col in fieldnames])
-            conn.execute(
-                text(f'CREATE TABLE IF NOT EXISTS "{table_name}" ({columns_sql})')
+    @contextmanager
+    def import_transaction(self):
+        """
+        Open a single transaction that can be shared across several import_rows calls.
+        Lets a paged Airtable import write every page and commit once at the end.
+        On SQLite the transaction is started with BEGIN IMMEDIATE, and imports running in
+        other threads wait for this one to commit.
+
+        Yields:
+            The connection to pass as ``conn`` to import_rows / delete_table
+        """
+        lock = self._write_lock if self.engine.dialect.name == 'sqlite' else nullcontext()
+        with lock:
+            try:
+                with self.engine.connect() as conn:
+                    with self.importer_pragmas(conn):
+                        with conn.begin():
+                            if self.engine.dialect.name == 'sqlite':
+                                # Take the write lock up front instead of upgrading mid-import
+                                conn.exec_driver_sql("BEGIN IMMEDIATE")
+                            yield conn
+            finally:
+                # Columns read inside the transaction may have been rolled back
+                self._invalidate_columns()
+            self._bump_write_generation()
+
+    @contextmanager
+    def importer_pragmas(self, conn):
+        """
+        Tune a SQLite connection for a bulk import: a larger page cache and no automatic
+        WAL checkpoints while rows are written. On exit the defaults are restored and the
+        WAL is checkpointed and truncated once. Does nothing on other databases.
+
+        Must be entered outside of a transaction on ``conn``.
+        """
+        if self.engine.dialect.name != 'sqlite':
+            yield
+            return
+        conn.exec_driver_sql(f"PRAGMA cache_size={SQLITE_IMPORT_CACHE_SIZE}")
+        conn.exec_driver_sql("PRAGMA wal_autocheckpoint=0")
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.exec_driver_sql(f"PRAGMA cache_size={SQLITE_DEFAULT_CACHE_SIZE}")
+            conn.exec_driver_sql(f"PRAGMA wal_autocheckpoint={SQLITE_DEFAULT_WAL_AUTOCHECKPOINT}")
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.commit()
+
+    def _get_existing_columns(self, conn, table_name: str, cache: bool = True) -> frozenset:
+        """
+        Get the set of column names currently defined on a table.
+        The schema is only queried on the first call per table; the result is cached until
+        _invalidate_columns is called for that table.
+        Pass cache=False inside an uncommitted import transaction: the schema it sees may
+        still be rolled back, so it is read fresh and not remembered.
+        """
+        cache = cache and self._cache_columns
+        if cache:
+            columns = self._columns_cache.get(table_name)
+            if columns is not None:
+                return columns
+
+        if self.engine.dialect.name == 'postgresql':
+            # PostgreSQL syntax (production)
+            existing_columns_result = conn.execute(
+                text("SELECT column_name FROM information_schema.columns WHERE table_name = :table_name"),
+                {"table_name": table_name}
             )
-            # Clear existing data (optional, comment out if you want to append)
-            conn.execute(text(f'DELETE FROM "{table_name}"'))
-            # Insert rows using named parameters and dicts
-            placeholders = ', '.join([f':{col}' for col in fieldnames])
-            quoted_fieldnames = ', '.join([f'"{col}"' for col in fieldnames])
-            insert_sql = text(f'INSERT INTO "{table_name}" ({quoted_fieldnames}) VALUES ({placeholders})')
-            for row in reader:
-                # Ensure all keys exist (fill missing with empty string)
-                row_dict = {col: row.get(col, '') for col in fieldnames}
-                conn.execute(insert_sql, row_dict)
+            columns = frozenset(row[0] for row in existing_columns_result.fetchall())
+        else:
+            # SQLite syntax (local development)
+            existing_columns_result = conn.execute(text(f'PRAGMA table_info({self._quote_identifier(table_name)})'))
+            columns = frozenset(row[1] for row in existing_columns_result.fetchall())  # row[1] is column name
+
+        # No columns means the table doesn't exist (yet), which is not worth remembering
+        if cache and columns:
+            self._columns_cache[table_name] = columns
+        return columns
+
+    def _invalidate_columns(self, table_name: Optional[str] = None):
+        """Forget the cached columns of one table, or of every table if table_name is None."""
+        if table_name is None:
+            self._columns_cache.clear()
+        else:
+            self._columns_cache.pop(table_name, None)
+
+    def import_rows(self, table_name: str, fieldnames: list, rows, conn=None):
+        """
+        Import rows straight into the specified table using bound parameters.
+        Values are passed to the database as-is, so commas, quotes and newlines need no escaping.
+
+        Args:
+            table_name: Name of the table to import into
+            fieldnames: Column names, in the order the values appear in each row
+            rows: Iterable of sequences aligned to fieldnames
+            conn: Optional connection from import_transaction(). If None, a new transaction is used.
+        """
+        if conn is None:
+            with self.import_transaction() as conn:
+                return self.import_rows(table_name, fieldnames, rows, conn=conn)
+
+        table = self._quote_identifier(table_name)
+        # Create table if not exists
+        columns_sql = ', '.join([f'{self._quote_identifier(col)} TEXT' for col in fieldnames])
+        conn.execute(
+            text(f'CREATE TABLE IF NOT EXISTS {table} ({columns_sql})')
+        )
+        # Clear existing data (optional, comment out if you want to append)
+        conn.execute(text(f'DELETE FROM {table}'))
+
+        quoted_fieldnames = ', '.join([self._quote_identifier(col) for col in fieldnames])
+        insert_into = f'INSERT INTO {table} ({quoted_fieldnames})'
+        # Positional placeholders in the driver's own paramstyle (? for sqlite3, %s for psycopg2)
+        if self.engine.dialect.paramstyle == 'qmark':
+            placeholder = '?'
+        else:
+            placeholder = '%s'
+            # psycopg2 reads % as a parameter marker, so escape it in identifiers
+            insert_into = insert_into.replace('%', '%%')
+        insert_sql = f"{insert_into} VALUES ({', '.join([placeholder] * len(fieldnames))})"
+        rows = [tuple(row) for row in rows]
+        if rows:
+            # A list of parameter tuples runs as a single executemany
+            conn.exec_driver_sql(insert_sql, rows)
+
+    def create_indexes(self, table_name: str, index_columns: list, conn=None):
+        """
+        Create an index on each of the given columns, skipping columns the table does not have.
+        Run after a bulk import so the rows are indexed once rather than on every insert.
+
+        Args:
+            table_name: Name of the table to index
+            index_columns: Column names to index
+            conn: Optional connection from import_transaction(). If None, a new transaction is used.
+        """
+        if not index_columns:
+            return
+        if conn is None:
+            with self.import_transaction() as conn:
+                return self.create_indexes(table_name, index_columns, conn=conn)
+
+        existing_columns = self._get_existing_columns(conn, table_name, cache=False)
+        for col in index_columns:
+            if col not in existing_columns:
+                continue
+            conn.execute(text(
+                f'CREATE INDEX IF NOT EXISTS {self._index_name(table_name, col)} '
+                f'ON {self._quote_identifier(table_name)} ({self._quote_identifier(col)})'
+            ))
+
+    def drop_indexes(self, table_name: str, index_columns: list, conn=None):
+        """
+        Drop the indexes create_indexes made on the given columns, if they exist.
+        Used before replacing a table's rows in place, so the bulk insert does not
+        update the indexes row by row.
+
+        Args:
+            table_name: Name of the indexed table
+            index_columns: Column names whose indexes should be dropped
+            conn: Optional connection from import_transaction(). If None, a new transaction is used.
+        """
+        if not index_columns:
+            return
+        if conn is None:
+            with self.import_transaction() as conn:
+                return self.drop_indexes(table_name, index_columns, conn=conn)
+
+        for col in index_columns:
+            conn.execute(text(f'DROP INDEX IF EXISTS {self._index_name(table_name, col)}'))
+
+    def _index_name(self, table_name: str, column: str) -> str:
+        """Quoted name of the lookup index on a table column."""
+        return self._quote_identifier(f"idx_{table_name}_{column}")
+
+    def import_csv_rows(self, table_name: str, csv_data: str, conn=None):
+        """
+        Import CSV text (with a header row) into the specified table.
+        See import_rows for the meaning of conn.
+        """
+        reader = csv.DictReader(io.StringIO(csv_data))
+        fieldnames = reader.fieldnames
+        # Ensure all keys exist (fill missing with empty string)
+        rows = [[row.get(col, '') for col in fieldnames] for row in reader]
+        self.import_rows(table_name, fieldnames, rows, conn=conn)
+
+    @staticmethod
+    def _quote_identifier(name: str) -> str:
+        """Quote a table or column name, escaping any embedded double quotes."""
+        return '"' + str(name).replace('"', '""') + '"'
+
+    def _lookup_statement(self, table_name: str, column_containing_reference: str, target_column: Optional[str] = None):
+        """
+        Get the parameterized SELECT used by the find_* lookups, built once per
+        (table, lookup column, target column). Reusing the same statement skips rebuilding
+        the SQL and lets the driver's prepared-statement cache hit on every call.
+        The reference value is always bound as :value.
+        """
+        key = (table_name, column_containing_reference, target_column)
+        statement = self._stmt_cache.get(key)
+        if statement is None:
+            selected = self._quote_identifier(target_column) if target_column is not None else '*'
+            statement = text(
+                f'SELECT {selected} FROM {self._quote_identifier(table_name)} '
+                f'WHERE {self._quote_identifier(column_containing_reference)} = :value'
+            )
+            if len(self._stmt_cache) >= LOOKUP_STATEMENT_CACHE_SIZE:
+                self._stmt_cache.clear()
+            self._stmt_cache[key] = statement
+        return statement
+
+    def iter_rows(self, table_name: str, batch_size: int = 500):
+        """
+        Yield every row of a table as a dict, fetching batch_size rows at a time
+        instead of loading the whole table into memory.
+
+        One pooled connection stays checked out, with its read transaction open, until the
+        generator is exhausted or closed. On SQLite that read snapshot also stops WAL
+        checkpoints from getting past it, so consume or close the generator promptly.
+        """
+        with self.engine.connect() as conn:
+            result = conn.execution_options(yield_per=batch_size).execute(
+                text(f'SELECT * FROM {self._quote_identifier(table_name)}')
+            )
+            columns = list(result.keys())
+            for row in result:
+                yield dict(zip(columns, row))
 
     def find_row_by_column(self, table_name: str, column_containing_reference: str, reference_value: str):
         with self.engine.connect() as conn:
             result = conn.execute(
-                text(f'SELECT * FROM "{table_name}" WHERE "{column_containing_reference}" = :value'), {"value": reference_value}
+                self._lookup_statement(table_name, column_containing_reference), {"value": reference_value}
             )
             row = result.fetchone()
             if row:
@@ -152,7 +432,7 @@ class SQLiteStorage:
         """
         with self.engine.connect() as conn:
             result = conn.execute(
-                text(f'SELECT * FROM "{table_name}" WHERE "{column_containing_reference}" = :value'), {"value": reference_value}
+                self._lookup_statement(table_name, column_containing_reference), {"value": reference_value}
             )
             rows = result.fetchall()  # Get ALL matching rows
             if rows:
@@ -166,8 +446,8 @@ class SQLiteStorage:
         """
         with self.engine.connect() as conn:
             result = conn.execute(
-                text(f'SELECT "{target_column}" FROM "{table_name}" WHERE "{column_containing_reference}" = :reference_value'),
-                {"reference_value": reference_value}
+                self._lookup_statement(table_name, column_containing_reference, target_column),
+                {"value": reference_value}
             )
             row = result.fetchone()
             if row:
@@ -188,11 +468,15 @@ class SQLiteStorage:
                 # Use transaction context for write operations (required for PostgreSQL)
                 with self.engine.begin() as conn:
                     result = conn.execute(text(sql_query))
-                    return [{
-                        "operation": "completed",
-                        "rows_affected": result.rowcount,
-                        "message": f"Query executed successfully. {result.rowcount} rows affected."
-                    }]
+                    rows_affected = result.rowcount
+                # The query may have changed any table's schema
+                self._invalidate_columns()
+                self._bump_write_generation()
+                return [{
+                    "operation": "completed",
+                    "rows_affected": rows_affected,
+                    "message": f"Query executed successfully. {rows_affected} rows affected."
+                }]
             else:
                 # Use regular connection for read operations
                 with self.engine.connect() as conn:
@@ -205,6 +489,7 @@ class SQLiteStorage:
             return None
 
 
+    @_invalidates_reads
     def modify_field(self, table_name: str, column_containing_reference: str, reference_value: str, target_column: str, new_value):
         """
         Modify a field in the specified table.
@@ -222,7 +507,6 @@ class SQLiteStorage:
         try:
             # Convert complex data types to JSON strings
             if isinstance(new_value, (list, dict)):
-                import json
                 processed_value = json.dumps(new_value)
                 print(f"JSON-serialized {type(new_value).__name__} for database storage: {processed_value}")
             else:
@@ -230,7 +514,8 @@ class SQLiteStorage:
             
             with self.engine.begin() as conn:
                 result = conn.execute(
-                    text(f'UPDATE "{table_name}" SET "{target_column}" = :new_value WHERE "{column_containing_reference}" = :reference_value'),
+                    text(f'UPDATE {self._quote_identifier(table_name)} SET {self._quote_identifier(target_column)} = :new_value '
+                         f'WHERE {self._quote_identifier(column_containing_reference)} = :reference_value'),
                     {"new_value": processed_value, "reference_value": reference_value}
                 )
                 return result.rowcount > 0
@@ -239,6 +524,7 @@ class SQLiteStorage:
             print(f"Error modifying field in {table_name}: {e}")
             return False
 
+    @_invalidates_reads
     def add_record(self, table_name: str, record_data: dict) -> bool:
         """
         Add a new record to the specified table.
@@ -258,43 +544,35 @@ class SQLiteStorage:
             fieldnames = list(record_data.keys())
             
             # Check for special characters in column names
-            import re
             special_char_pattern = re.compile(r'[^a-zA-Z0-9_]')
             for col in fieldnames:
                 if special_char_pattern.search(col):
                     print(f"Warning: Column name '{col}' in table '{table_name}' contains special characters. This may cause issues with SQLite.")
             
+            table = self._quote_identifier(table_name)
             with self.engine.begin() as conn:
                 # Check if table exists (database-agnostic way)
                 try:
                     # Try to query the table - if it doesn't exist, this will raise an exception
-                    conn.execute(text(f'SELECT 1 FROM "{table_name}" LIMIT 1'))
+                    conn.execute(text(f'SELECT 1 FROM {table} LIMIT 1'))
                     table_exists = True
                 except Exception:
                     table_exists = False
                 
                 if not table_exists:
                     # Create table if it doesn't exist
-                    columns_sql = ', '.join([f'"{col}" TEXT' for col in fieldnames])
+                    columns_sql = ', '.join([f'{self._quote_identifier(col)} TEXT' for col in fieldnames])
                     conn.execute(
-                        text(f'CREATE TABLE IF NOT EXISTS "{table_name}" ({columns_sql})')
+                        text(f'CREATE TABLE IF NOT EXISTS {table} ({columns_sql})')
                     )
                 else:
                     # Table exists, check for missing columns and add them (database-agnostic way)
                     try:
-                        # Get existing columns based on environment
-                        MODE = load_env('ENVIRONMENT_MODE')
-                        if MODE == 'Production':
-                            # PostgreSQL syntax (production)
-                            existing_columns_result = conn.execute(
-                                text("SELECT column_name FROM information_schema.columns WHERE table_name = :table_name"),
-                                {"table_name": table_name}
-                            )
-                            existing_columns = {row[0] for row in existing_columns_result.fetchall()}
-                        else:
-                            # SQLite syntax (local development)
-                            existing_columns_result = conn.execute(text(f'PRAGMA table_info("{table_name}")'))
-                            existing_columns = {row[1] for row in existing_columns_result.fetchall()}  # row[1] is column name
+                        existing_columns = self._get_existing_columns(conn, table_name)
+                        if not existing_columns.issuperset(fieldnames):
+                            # Another process may have added the columns since they were cached
+                            self._invalidate_columns(table_name)
+                            existing_columns = self._get_existing_columns(conn, table_name)
                     except Exception as e:
                         print(f"Error getting column info for {table_name}: {e}")
                         # If we can't get column info, assume all columns are missing and try to add them
@@ -304,36 +582,40 @@ class SQLiteStorage:
                     for col in missing_columns:
                         try:
                             print(f"Adding missing column '{col}' to table '{table_name}'")
-                            conn.execute(text(f'ALTER TABLE "{table_name}" ADD COLUMN "{col}" TEXT'))
+                            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {self._quote_identifier(col)} TEXT'))
                         except Exception as e:
                             print(f"Warning: Could not add column '{col}' to table '{table_name}': {e}")
                             # Continue anyway - the INSERT might still work if the column actually exists
+                    if missing_columns:
+                        self._invalidate_columns(table_name)
                 
-                # Insert the new record
-                placeholders = ', '.join([f':{col}' for col in fieldnames])
-                quoted_fieldnames = ', '.join([f'"{col}"' for col in fieldnames])
-                insert_sql = text(f'INSERT INTO "{table_name}" ({quoted_fieldnames}) VALUES ({placeholders})')
+                # Insert the new record, with generated parameter names since column names may not be valid bind names
+                placeholders = ', '.join([f':p{i}' for i in range(len(fieldnames))])
+                quoted_fieldnames = ', '.join([self._quote_identifier(col) for col in fieldnames])
+                insert_sql = text(f'INSERT INTO {table} ({quoted_fieldnames}) VALUES ({placeholders})')
                 
                 # Ensure all keys exist and convert complex data types to JSON strings
                 row_dict = {}
-                for col in fieldnames:
+                for i, col in enumerate(fieldnames):
                     value = record_data.get(col, '')
                     # Convert complex data types to JSON strings
                     if isinstance(value, (list, dict)):
-                        import json
-                        row_dict[col] = json.dumps(value)
-                        print(f"JSON-serialized {type(value).__name__} for database storage in column '{col}': {row_dict[col]}")
+                        row_dict[f'p{i}'] = json.dumps(value)
+                        print(f"JSON-serialized {type(value).__name__} for database storage in column '{col}': {row_dict[f'p{i}']}")
                     else:
-                        row_dict[col] = value
+                        row_dict[f'p{i}'] = value
                         
                 result = conn.execute(insert_sql, row_dict)
                 
                 return result.rowcount > 0
                 
         except Exception as e:
+            # The cached columns may list one another process has since dropped
+            self._invalidate_columns(table_name)
             print(f"Error adding record to {table_name}: {e}")
             return False
 
+    @_invalidates_reads
     def delete_record(self, table_name: str, column_name: str, value: str) -> bool:
         """
         Delete a record from the table.
@@ -350,7 +632,7 @@ class SQLiteStorage:
             with self.engine.begin() as conn:
                 # Check if table exists (database-agnostic way)
                 try:
-                    conn.execute(text(f'SELECT 1 FROM "{table_name}" LIMIT 1'))
+                    conn.execute(text(f'SELECT 1 FROM {self._quote_identifier(table_name)} LIMIT 1'))
                     table_exists = True
                 except Exception:
                     table_exists = False
@@ -361,18 +643,11 @@ class SQLiteStorage:
                 
                 # Check if column exists (database-agnostic way)
                 try:
-                    MODE = load_env('ENVIRONMENT_MODE')
-                    if MODE == 'Production':
-                        # PostgreSQL syntax (production)
-                        existing_columns_result = conn.execute(
-                            text("SELECT column_name FROM information_schema.columns WHERE table_name = :table_name"),
-                            {"table_name": table_name}
-                        )
-                        existing_columns = {row[0] for row in existing_columns_result.fetchall()}
-                    else:
-                        # SQLite syntax (local development)
-                        existing_columns_result = conn.execute(text(f'PRAGMA table_info("{table_name}")'))
-                        existing_columns = {row[1] for row in existing_columns_result.fetchall()}
+                    existing_columns = self._get_existing_columns(conn, table_name)
+                    if column_name not in existing_columns:
+                        # Another process may have added the column since it was cached
+                        self._invalidate_columns(table_name)
+                        existing_columns = self._get_existing_columns(conn, table_name)
                     
                     if column_name not in existing_columns:
                         print(f"Column {column_name} does not exist in table {table_name}")
@@ -382,7 +657,9 @@ class SQLiteStorage:
                     # Proceed anyway - the DELETE might still work
                 
                 # Execute delete statement
-                delete_stmt = text(f'DELETE FROM "{table_name}" WHERE "{column_name}" = :value')
+                delete_stmt = text(
+                    f'DELETE FROM {self._quote_identifier(table_name)} WHERE {self._quote_identifier(column_name)} = :value'
+                )
                 result = conn.execute(delete_stmt, {"value": value})
                 
                 return result.rowcount > 0
@@ -405,7 +682,7 @@ class SQLiteStorage:
                 for table_name in critical_tables:
                     try:
                         # Check if table exists and has data
-                        result = conn.execute(text(f'SELECT COUNT(*) as count FROM "{table_name}" LIMIT 1'))
+                        result = conn.execute(text(f'SELECT COUNT(*) as count FROM {self._quote_identifier(table_name)} LIMIT 1'))
                         row = result.fetchone()
                         if row and row[0] > 0:
                             print(f"Found {row[0]} records in {table_name}")
@@ -431,21 +708,30 @@ class SQLiteStorage:
             # If we can't check, assume empty to trigger initial sync
             return False
 
-    def delete_table(self, table_name: str) -> bool:
+    @_invalidates_reads
+    def delete_table(self, table_name: str, conn=None) -> bool:
         """
         Delete/drop a table from the database.
         
         Args:
             table_name: Name of the table to delete
+            conn: Optional connection from import_transaction() to drop the table inside
             
         Returns:
             bool: True if table was deleted successfully, False otherwise
         """
+        drop_sql = text(f'DROP TABLE IF EXISTS {self._quote_identifier(table_name)}')
+        if conn is not None:
+            conn.execute(drop_sql)
+            self._invalidate_columns(table_name)
+            print(f"Successfully deleted table: {table_name}")
+            return True
         try:
             with self.engine.connect() as conn:
-                # Use double quotes to handle table names with special characters
-                conn.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
+                # Quoted to handle table names with special characters
+                conn.execute(drop_sql)
                 conn.commit()
+                self._invalidate_columns(table_name)
                 print(f"Successfully deleted table: {table_name}")
                 return True
         except Exception as e:
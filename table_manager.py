@@ -1,56 +1,106 @@
 import os
 from airtable import Airtable
 import csv
-import io
 import json
-from typing import Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+import requests
 from sqlite_storage import SQLiteStorage
 from utilities import convert_value_for_airtable, parse_database_row
 
+class _EchoBuffer:
+    """File-like object whose write returns the text, so csv.writer.writerow yields each line."""
+    def write(self, value):
+        return value
+
+
 class TableManager:
-    def __init__(self, base_id, table_name, api_key, sqlite_storage: Optional[SQLiteStorage] = None):
+    # Max (column, reference, target) lookups remembered by get_value_by_row_and_column, 0 disables
+    VALUE_CACHE_SIZE = 4096
+    # Seconds a remembered lookup is trusted; bounds staleness from writes by other processes
+    VALUE_CACHE_TTL = 30
+
+    def __init__(self, base_id, table_name, api_key, sqlite_storage: Optional[SQLiteStorage] = None,
+                 index_columns: Optional[List[str]] = None, session: Optional[requests.Session] = None):
         self.base_id = base_id
         self.table_name = table_name
         self.api_key = api_key
         self.sqlite_storage = sqlite_storage
+        # One Airtable client per table, so its connection is reused across imports and uploads
+        self._airtable = Airtable(base_id, table_name, api_key)
+        if session is not None:
+            # Share the caller's keep-alive pool (already authorised for this base) across tables
+            self._airtable.session = session
+        # Lookup columns to index in SQLite after each import
+        self.index_columns = list(index_columns) if index_columns else []
         self.has_updates = False  # Track if any updates have been made
+        # LRU of get_value_by_row_and_column results, valid while the storage's write_generation is unchanged.
+        # Off on Postgres, where other dynos and workers write to the same database without bumping it.
+        if sqlite_storage is not None and sqlite_storage.engine.dialect.name == 'postgresql':
+            self.value_cache_size = 0
+        else:
+            self.value_cache_size = self.VALUE_CACHE_SIZE
+        self._value_cache = OrderedDict()  # key -> (time cached, value)
+        self._value_cache_generation = None
+        self._value_cache_lock = threading.Lock()
 
-    # Fetch data from Airtable and store in SQLite using csv writer
+    # Fetch data from Airtable and store in SQLite
     def update_database_from_airtable(self, force_delete=True):
-        # Note: Ideally this would be done with a dictwriter, but I cant seem to get it to work
-
-        airtable = Airtable(self.base_id, self.table_name, self.api_key)
-        records = airtable.get_all()
-        if not records:
+        # Store in SQLite only, so there is nothing to fetch without storage
+        if not self.sqlite_storage:
             return None
 
-        fieldnames = set()
-        for record in records:
-            fieldnames.update(record['fields'].keys())
-        fieldnames = list(fieldnames)
-
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for record in records:
-            # Ensure row doesnt have a comma
-            record = self.record_comma_check(record)
-            # Write the record to CSV
-            writer.writerow(record['fields'])
+        # Fetch every page before opening the write transaction, so the database is
+        # never locked while waiting on Airtable (page requests and the client's API_LIMIT sleep).
+        # All pages share the client's requests.Session, so the connection is reused.
+        pages = [page for page in self._airtable.get_iter(page_size=100) if page]
+        if not pages:
+            return None
 
-        csv_data = output.getvalue()
-        output.close()
+        records_fields = [record['fields'] for page in pages for record in page]
+        # Ordered like a set union, but keeps first-seen order so columns are stable.
+        # Taken over every page, because Airtable leaves empty fields out of a record.
+        fieldnames = {}
+        for fields in records_fields:
+            fieldnames.update(dict.fromkeys(fields))
+        columns = list(fieldnames)
+        to_db_value = self.field_to_db_value
+        # Bind field values directly, no CSV encoding or quoting needed. Missing fields are
+        # stored as '' like every other empty value.
+        rows = [tuple(to_db_value(fields.get(field)) for field in columns) for fields in records_fields]
 
-        # Store in SQLite only
-        if self.sqlite_storage:
+        # One short transaction for the local writes so the import commits once
+        with self.sqlite_storage.import_transaction() as conn:
             # Delete the existing table if force_delete is True (default behavior)
             if force_delete:
-                self.sqlite_storage.delete_table(self.table_name)
-            self.sqlite_storage.import_csv_rows(self.table_name, csv_data)
+                self.sqlite_storage.delete_table(self.table_name, conn=conn)
+            else:
+                # The table's rows are replaced in place; drop its lookup indexes so the
+                # bulk insert doesn't maintain them row by row. They are rebuilt below.
+                self.sqlite_storage.drop_indexes(self.table_name, self.index_columns, conn=conn)
+
+            self.sqlite_storage.import_rows(self.table_name, columns, rows, conn=conn)
+
+            # Index once all pages are loaded, instead of maintaining the index on every insert
+            self.sqlite_storage.create_indexes(self.table_name, self.index_columns, conn=conn)
 
         return f"Successfully updated DB from Airtable for table {self.table_name}."
 
+    @staticmethod
+    def field_to_db_value(value) -> str:
+        """
+        Convert an Airtable field value to the text stored in the database.
+        Missing fields become empty strings and lists/numbers are stored as str(value),
+        which parse_database_row turns back into lists.
+        """
+        if value is None:
+            return ''
+        if isinstance(value, str):
+            return value
+        return str(value)
+
 
     def get_row(self, column_containing_reference: str, reference_value: str):
         if self.sqlite_storage:
@@ -73,9 +123,34 @@ class TableManager:
         return []
 
     def get_value_by_row_and_column(self, column_containing_reference: str, reference_value: str, target_column: str):
-        if self.sqlite_storage:
+        if not self.sqlite_storage:
+            return None
+        if self.value_cache_size <= 0:
             return self.sqlite_storage.find_value_by_row_and_column(self.table_name, column_containing_reference, reference_value, target_column)
-        return None
+
+        key = (column_containing_reference, reference_value, target_column)
+        generation = self.sqlite_storage.write_generation
+        now = time.monotonic()
+        with self._value_cache_lock:
+            if generation != self._value_cache_generation:
+                # Something was written since these values were read
+                self._value_cache.clear()
+                self._value_cache_generation = generation
+            elif key in self._value_cache:
+                cached_at, value = self._value_cache[key]
+                if now - cached_at < self.VALUE_CACHE_TTL:
+                    self._value_cache.move_to_end(key)
+                    return value
+                del self._value_cache[key]
+
+        value = self.sqlite_storage.find_value_by_row_and_column(self.table_name, column_containing_reference, reference_value, target_column)
+
+        with self._value_cache_lock:
+            if generation == self._value_cache_generation:
+                self._value_cache[key] = (now, value)
+                if len(self._value_cache) > self.value_cache_size:
+                    self._value_cache.popitem(last=False)
+        return value
 
     def execute_sql_query(self, sql_query: str):
         """
@@ -111,19 +186,6 @@ class TableManager:
 
         return updated
 
-    @staticmethod
-    def record_comma_check(record) -> bool:
-        """
-        Check if the CSV data contains commas in any field.
-        Wraps fields with commas in double quotes.
-        """
-        for key in record['fields']:
-            if isinstance(record['fields'][key], str):
-                if ',' in record['fields'][key]:
-                    # Wrap in double quotes to handle commas
-                    record['fields'][key] = record['fields'][key].replace('"', '""')
-        return record
-
     def upload_to_airtable(self) -> Optional[str]:
         """
         
@@ -133,13 +195,13 @@ class TableManager:
                 return "Error: No SQLite storage configured"
             
             # Get all records from local database
-            sql = f"SELECT * FROM \"{self.table_name}\""
+            sql = f"SELECT * FROM {SQLiteStorage._quote_identifier(self.table_name)}"
             records = self.sqlite_storage.execute_sql_query(self.table_name, sql)
             
             if not records:
                 return "No records found to upload"
             
-            airtable = Airtable(self.base_id, self.table_name, self.api_key)
+            airtable = self._airtable
             
             # Delete all existing records
             existing_records = airtable.get_all()
@@ -234,13 +296,44 @@ class TableManager:
             return None
             
         try:
-            sql = f"SELECT * FROM \"{self.table_name}\""
+            sql = f"SELECT * FROM {SQLiteStorage._quote_identifier(self.table_name)}"
             records = self.sqlite_storage.execute_sql_query(self.table_name, sql)
             return records if records else []
         except Exception as e:
             print(f"Error getting full table {self.table_name}: {e}")
             return []
 
+    def stream_csv(self):
+        """
+        Stream the table as CSV text, one line at a time, so large tables can be sent
+        in a response without building the whole file as a string.
+        The rows come from iter_rows, so a database connection is held for the whole
+        download and released when the generator finishes or is closed.
+        
+        Returns:
+            Generator of CSV lines (header first), or None if the table has no data
+        """
+        if not self.sqlite_storage:
+            return None
+            
+        try:
+            records = self.sqlite_storage.iter_rows(self.table_name)
+            first_record = next(records, None)
+        except Exception as e:
+            print(f"Error reading table {self.table_name} for CSV: {e}")
+            return None
+        if first_record is None:
+            return None
+        return self._csv_lines(first_record, records)
+
+    @staticmethod
+    def _csv_lines(first_record: dict, records):
+        writer = csv.writer(_EchoBuffer())
+        yield writer.writerow(first_record.keys())
+        yield writer.writerow(first_record.values())
+        for record in records:
+            yield writer.writerow(record.values())
+
     def get_table_as_json(self):
         """
         Convert the entire table to JSON format.
@@ -1,5 +1,8 @@
 import os
-from airtable_multi_manager import AirtableMultiManager
+import shutil
+import tempfile
+from contextlib import contextmanager
+from airtable_multi_manager import AirtableMultiManager, _BaseRateLimiter
 from sqlite_storage import SQLiteStorage
 from table_manager import TableManager
 from student_data_manager import StudentDataManager
@@ -58,6 +61,190 @@ def test_database_example():
     
     assert isinstance(table_data, list)
 
+@contextmanager
+def _temp_sqlite_storage(name):
+    """Yield a SQLiteStorage backed by a throwaway database file, removed afterwards."""
+    temp_dir = tempfile.mkdtemp()
+    sqlite_store = SQLiteStorage(os.path.join(temp_dir, f"{name}.db"))
+    try:
+        yield sqlite_store
+    finally:
+        sqlite_store.engine.dispose()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def test_import_csv_rows_in_transaction():
+    with _temp_sqlite_storage("csv_import_test") as sqlite_store:
+        table_name = "csv_import_test"
+        sqlite_store.import_csv_rows(table_name, "name,level\nAria,1\n")
+
+        # A re-import replaces the table's rows, and commits with the rest of the transaction
+        with sqlite_store.import_transaction() as conn:
+            sqlite_store.import_csv_rows(table_name, "name,level\nBeau,2\nCleo,3\n", conn=conn)
+
+        rows = sqlite_store.execute_sql_query(table_name, f'SELECT * FROM "{table_name}"')
+        assert [row["name"] for row in rows] == ["Beau", "Cleo"]
+        assert sqlite_store.find_value_by_row_and_column(table_name, "name", "Cleo", "level") == "3"
+
+def test_update_database_from_airtable_pages():
+    pages = [
+        [{"fields": {"website_id": 1, "name": "Aria"}}, {"fields": {"website_id": 2, "name": "Beau"}}],
+        [{"fields": {"website_id": 3, "house": "Kea", "name": "Cleo"}}, {"fields": {"website_id": 4}}],
+        [],
+    ]
+    with _temp_sqlite_storage("airtable_pages_test") as sqlite_store:
+        table_name = "airtable_pages_test"
+        manager = TableManager("base", table_name, "key", sqlite_storage=sqlite_store, index_columns=["website_id", "house"])
+        manager._airtable.get_iter = lambda **kwargs: iter(pages)
+
+        assert manager.update_database_from_airtable() is not None
+
+        rows = sqlite_store.execute_sql_query(table_name, f'SELECT * FROM "{table_name}"')
+        assert len(rows) == 4
+        # Columns keep first-seen order, with ones added by later pages at the end
+        assert list(rows[0].keys()) == ["website_id", "name", "house"]
+        assert sqlite_store.find_value_by_row_and_column(table_name, "website_id", "3", "house") == "Kea"
+        # Rows without a field get "" for it, whichever page the column first appeared on
+        assert sqlite_store.find_value_by_row_and_column(table_name, "website_id", "1", "house") == ""
+        assert sqlite_store.find_value_by_row_and_column(table_name, "website_id", "2", "house") == ""
+        assert sqlite_store.find_value_by_row_and_column(table_name, "website_id", "4", "name") == ""
+
+        indexes = sqlite_store.execute_sql_query(table_name, f'PRAGMA index_list("{table_name}")')
+        assert sorted(index["name"] for index in indexes) == [f"idx_{table_name}_house", f"idx_{table_name}_website_id"]
+
+    # Without storage there is nowhere to import to, so Airtable is never queried
+    manager = TableManager("base", "no_storage_test", "key")
+    def fail_get_iter(**kwargs):
+        raise AssertionError("get_iter should not be called without storage")
+    manager._airtable.get_iter = fail_get_iter
+    assert manager.update_database_from_airtable() is None
+
+def test_csv_route_streams_table():
+    from app import multi_manager as app_multi_manager
+    with _temp_sqlite_storage("csv_route_test") as sqlite_store:
+        table_name = "csv_route_test"
+        sqlite_store.import_rows(table_name, ["name", "quest"], [("Aria", 'Find the "garlic", then rest'), ("Beau", "")])
+        app_multi_manager.managers[table_name] = TableManager("base", table_name, "key", sqlite_storage=sqlite_store)
+        try:
+            with app.test_client() as client:
+                response = client.get(f"/data/csv/{table_name}")
+                assert response.status_code == 200
+                assert response.mimetype == "text/csv"
+                assert response.get_data(as_text=True) == 'name,quest\r\nAria,"Find the ""garlic"", then rest"\r\nBeau,\r\n'
+                # The connection iter_rows held for the download goes back to the pool
+                response.close()
+                assert sqlite_store.engine.pool.checkedout() == 0
+
+                # Unknown tables and tables without rows are both not found
+                assert client.get("/data/csv/no_such_table").status_code == 404
+                sqlite_store.execute_sql_query(table_name, f'DELETE FROM "{table_name}"')
+                assert client.get(f"/data/csv/{table_name}").status_code == 404
+        finally:
+            app_multi_manager.remove_table(table_name)
+
+def test_import_rows_special_characters():
+    with _temp_sqlite_storage("import_rows_test") as sqlite_store:
+        table_name = "import_rows_test"
+        description = 'Find the "garlic", then\nreport back'
+
+        sqlite_store.import_rows(table_name, ["name", "description"], [("Garlic Hunt", description)])
+
+        assert sqlite_store.find_value_by_row_and_column(table_name, "name", "Garlic Hunt", "description") == description
+
+        # Table and column names are quoted wherever SQL is built, so spaces and quotes survive
+        odd_table = 'quest "log"'
+        sqlite_store.import_rows(odd_table, ["quest name", 'the "step"'], [("Garlic Hunt", "1")])
+        sqlite_store.create_indexes(odd_table, ["quest name"])
+        assert sqlite_store.add_record(odd_table, {"quest name": "Tui Song", "house colour": "red"})
+        assert sqlite_store.modify_field(odd_table, "quest name", "Tui Song", 'the "step"', "2")
+        assert sqlite_store.find_value_by_row_and_column(odd_table, "quest name", "Tui Song", 'the "step"') == "2"
+        assert sqlite_store.delete_record(odd_table, "house colour", "red")
+        sqlite_store.import_dict_rows(odd_table, [{"quest name": "Moa Walk", 'the "step"': "3"}])
+        assert sqlite_store.find_value_by_row_and_column(odd_table, "quest name", "Moa Walk", 'the "step"') == "3"
+        assert sqlite_store.delete_table(odd_table)
+
+def test_value_cache_invalidated_on_write():
+    with _temp_sqlite_storage("value_cache_test") as sqlite_store:
+        table_name = "value_cache_test"
+        sqlite_store.import_rows(table_name, ["name", "level"], [("Aria", "1")])
+        manager = TableManager("base", table_name, "key", sqlite_storage=sqlite_store)
+
+        assert manager.get_value_by_row_and_column("name", "Aria", "level") == "1"
+        assert manager.modify_field("name", "Aria", "level", "2")
+        assert manager.get_value_by_row_and_column("name", "Aria", "level") == "2"
+
+        sqlite_store.execute_sql_query(table_name, f'UPDATE "{table_name}" SET level = \'3\'')
+        assert manager.get_value_by_row_and_column("name", "Aria", "level") == "3"
+
+        # A write from another process doesn't bump write_generation, so only the TTL expires the entry
+        other_process_store = SQLiteStorage(sqlite_store.db_path)
+        other_process_store.execute_sql_query(table_name, f'UPDATE "{table_name}" SET level = \'4\'')
+        other_process_store.engine.dispose()
+        assert manager.get_value_by_row_and_column("name", "Aria", "level") == "3"
+        manager.VALUE_CACHE_TTL = 0
+        assert manager.get_value_by_row_and_column("name", "Aria", "level") == "4"
+
+def test_create_indexes_after_import():
+    with _temp_sqlite_storage("index_test") as sqlite_store:
+        table_name = "index_test"
+        sqlite_store.import_rows(table_name, ["website_id", "name"], [("1", "Aria"), ("2", "Beau")])
+        sqlite_store.create_indexes(table_name, ["website_id", "missing_column"])
+
+        indexes = sqlite_store.execute_sql_query(table_name, f"PRAGMA index_list(\"{table_name}\")")
+        assert [index["name"] for index in indexes] == [f"idx_{table_name}_website_id"]
+        assert sqlite_store.find_value_by_row_and_column(table_name, "website_id", "2", "name") == "Beau"
+
+def test_column_cache_follows_schema_changes():
+    with _temp_sqlite_storage("column_cache_test") as sqlite_store:
+        table_name = "column_cache_test"
+        sqlite_store.import_rows(table_name, ["website_id"], [("1",)])
+
+        assert sqlite_store.add_record(table_name, {"website_id": "2", "gamer_tag": "kea"})
+        assert sqlite_store.delete_record(table_name, "gamer_tag", "kea")
+
+        sqlite_store.delete_table(table_name)
+        sqlite_store.import_rows(table_name, ["nickname"], [("tui",)])
+        assert not sqlite_store.delete_record(table_name, "website_id", "1")
+        assert sqlite_store.delete_record(table_name, "nickname", "tui")
+
+        # Columns seen inside an import that is rolled back must not be remembered
+        try:
+            with sqlite_store.import_transaction() as conn:
+                sqlite_store.delete_table(table_name, conn=conn)
+                sqlite_store.import_rows(table_name, ["nickname", "house"], [("kea", "Tui")], conn=conn)
+                sqlite_store.create_indexes(table_name, ["house"], conn=conn)
+                raise RuntimeError("abort import")
+        except RuntimeError:
+            pass
+        assert not sqlite_store.delete_record(table_name, "house", "Tui")
+
+        # Schema changes made by another process are picked up without a restart
+        other_process_store = SQLiteStorage(sqlite_store.db_path)
+        other_process_store.delete_table(table_name)
+        other_process_store.import_rows(table_name, ["nickname", "house"], [("kea", "Tui")])
+        assert sqlite_store.delete_record(table_name, "house", "Tui")
+        other_process_store.delete_table(table_name)
+        other_process_store.import_rows(table_name, ["nickname"], [("kea",)])
+        # The first insert still trusts the cached "house" column and fails, which drops the cache
+        assert not sqlite_store.add_record(table_name, {"nickname": "moa", "house": "Kea"})
+        assert sqlite_store.add_record(table_name, {"nickname": "moa", "house": "Kea"})
+        other_process_store.engine.dispose()
+
+def test_sqlite_connection_pragmas():
+    with _temp_sqlite_storage("pragma_test") as sqlite_store:
+        with sqlite_store.engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+            assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+
+def test_base_rate_limiter_spaces_requests():
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    limiter = _BaseRateLimiter(requests_per_second=50)
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: limiter.wait(), range(11)))
+    # 11 requests at 50/s need at least 10 intervals of 20ms, whatever the thread count
+    assert time.monotonic() - start >= 0.2
+
 def test_database_columns_example():
 
     multi_manager = AirtableMultiManager.from_environment()
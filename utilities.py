@@ -7,6 +7,15 @@ from dotenv import load_dotenv, find_dotenv
 
 critical_tables = ['craffft_students', 'craffft_teachers', 'craffft_quests']
 
+# Columns the app looks rows up by, indexed after each import from Airtable
+default_index_columns = {
+    'craffft_students': ['website_id', 'record_id', 'current_class'],
+    'craffft_teachers': ['website_user_id'],
+    'craffft_steps': ['record_id', 'name'],
+    'craffft_quests': ['short_code'],
+    'craffft_achievements': ['name'],
+}
+
 
 # Load environment variables once at module import time
 # Load .env first (defaults), then .env.local (overrides)